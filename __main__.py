@@ -6,9 +6,6 @@ from typing import Annotated, Optional
 
 import typer
 
-from config import Config
-from bot import ClaudeTelegramBot
-
 __version__ = "0.1.0"
 
 app = typer.Typer(
@@ -64,13 +61,20 @@ def main(
     )
     logger = logging.getLogger(__name__)
 
+    # Deferred so --help/--version don't pay for the telegram stack import
+    from config import Config
+    from bot import ClaudeTelegramBot
+    from claude_runner import ClaudeExecutionError
+
     try:
         # Load configuration
         logger.info("Loading configuration...")
         cfg = Config.load(config_path)
-        logger.info(f"Project directory: {cfg.project_dir}")
-        logger.info(f"Authorized users: {cfg.authorized_users}")
-        logger.info(f"Discovered commands: {list(cfg.custom_commands.keys())}")
+        logger.info("Project directory: %s", cfg.project_dir)
+        logger.info("Authorized users: %s", cfg.authorized_users)
+        logger.info(
+            "Discovered commands: %s", [name for name, _ in cfg.sorted_commands]
+        )
 
         # Create and run bot
         logger.info("Starting bot...")
@@ -78,12 +82,15 @@ def main(
         bot.run()
 
     except ValueError as e:
-        logger.error(f"Configuration error: {e}")
+        logger.error("Configuration error: %s", e)
+        raise typer.Exit(1)
+    except ClaudeExecutionError as e:
+        logger.error("Claude CLI error: %s", e)
         raise typer.Exit(1)
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
-        logger.exception(f"Unexpected error: {e}")
+        logger.exception("Unexpected error: %s", e)
         raise typer.Exit(1)
 
 
@@ -45,8 +45,78 @@ class ClaudeTelegramBot:
             self.session_manager,
             config.authorized_users,
         )
+
+        # Commands never change at runtime, so build static texts once
+        self._welcome_body = self._build_welcome_body()
+        self._help_text = self._build_help_text()
+        self._bot_commands = self._build_bot_commands()
+
         self.application = self._build_application()
 
+    def _build_welcome_body(self) -> str:
+        """Build the /start text that follows the greeting.
+
+        Returns:
+            Welcome text without the user-specific greeting.
+        """
+        cmd_lines = []
+        for cmd, desc in self.config.sorted_commands:
+            cmd_lines.append(f"- {desc}: /{cmd}")
+
+        commands_text = "\n".join(cmd_lines) if cmd_lines else "- (no commands available)"
+
+        bot_name = self.config.bot_name or "your assistant"
+        return (
+            f"I'm {bot_name}.\n\n"
+            f"I can help you with:\n{commands_text}\n\n"
+            "You can also send natural language messages.\n"
+            "Use /clear to start a new session.\n"
+            "Use /help for more information."
+        )
+
+    def _build_help_text(self) -> str:
+        """Build the /help text.
+
+        Returns:
+            Help text listing general and custom commands.
+        """
+        cmd_lines = []
+        for cmd, desc in self.config.sorted_commands:
+            cmd_lines.append(f"/{cmd} - {desc}")
+
+        custom_commands = "\n".join(cmd_lines) if cmd_lines else "(no commands available)"
+
+        return (
+            "Available commands:\n\n"
+            "General:\n"
+            "/start - Welcome message\n"
+            "/help - This help\n"
+            "/clear - Clear session and start new\n\n"
+            f"Commands:\n{custom_commands}\n\n"
+            "You can send any message and it will be processed "
+            "by Claude Code."
+        )
+
+    def _build_bot_commands(self) -> list[BotCommand]:
+        """Build the command list for the Telegram menu.
+
+        Returns:
+            List of BotCommand entries.
+        """
+        # Base commands
+        commands = [
+            BotCommand("start", "Welcome message"),
+            BotCommand("help", "Show help"),
+            BotCommand("clear", "Clear session and start new"),
+        ]
+
+        # Add custom commands dynamically
+        for cmd, desc in self.config.sorted_commands:
+            # Telegram limits description to 256 chars
+            commands.append(BotCommand(cmd, desc[:256]))
+
+        return commands
+
     def _build_application(self) -> Application:
         """Build the Telegram bot application.
 
@@ -62,8 +132,7 @@ class ClaudeTelegramBot:
 
         # Custom commands (dynamically discovered from .claude/commands/)
         for cmd in self.config.custom_commands:
-            handler = self._make_command_handler(cmd)
-            app.add_handler(CommandHandler(cmd, handler))
+            app.add_handler(CommandHandler(cmd, partial(self._dispatch_custom, cmd)))
 
         # General message handler (must be last)
         app.add_handler(
@@ -78,22 +147,20 @@ class ClaudeTelegramBot:
 
         return app
 
-    def _make_command_handler(self, command: str):
-        """Create a command handler for a custom command.
+    async def _dispatch_custom(
+        self,
+        command: str,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+    ) -> None:
+        """Forward a custom command to the message handler.
 
         Args:
             command: Command name.
-
-        Returns:
-            Async handler function.
+            update: Telegram update object.
+            context: Bot context.
         """
-        async def handler(
-            update: Update,
-            context: ContextTypes.DEFAULT_TYPE,
-        ) -> None:
-            await self.handler.handle_command(update, context, command)
-
-        return handler
+        await self.handler.handle_command(update, context, command)
 
     async def _handle_start(
         self,
@@ -112,22 +179,7 @@ class ClaudeTelegramBot:
         user = update.effective_user
         name = user.first_name if user else "User"
 
-        # Build commands list dynamically
-        cmd_lines = []
-        for cmd, desc in sorted(self.config.custom_commands.items()):
-            cmd_lines.append(f"- {desc}: /{cmd}")
-
-        commands_text = "\n".join(cmd_lines) if cmd_lines else "- (no commands available)"
-
-        bot_name = self.config.bot_name or "your assistant"
-        welcome = (
-            f"Hello {name}! I'm {bot_name}.\n\n"
-            f"I can help you with:\n{commands_text}\n\n"
-            "You can also send natural language messages.\n"
-            "Use /clear to start a new session.\n"
-            "Use /help for more information."
-        )
-        await update.message.reply_text(welcome)
+        await update.message.reply_text(f"Hello {name}! {self._welcome_body}")
 
     async def _handle_help(
         self,
@@ -143,24 +195,7 @@ class ClaudeTelegramBot:
         if not update.message:
             return
 
-        # Build custom commands list dynamically
-        cmd_lines = []
-        for cmd, desc in sorted(self.config.custom_commands.items()):
-            cmd_lines.append(f"/{cmd} - {desc}")
-
-        custom_commands = "\n".join(cmd_lines) if cmd_lines else "(no commands available)"
-
-        help_text = (
-            "Available commands:\n\n"
-            "General:\n"
-            "/start - Welcome message\n"
-            "/help - This help\n"
-            "/clear - Clear session and start new\n\n"
-            f"Commands:\n{custom_commands}\n\n"
-            "You can send any message and it will be processed "
-            "by Claude Code."
-        )
-        await update.message.reply_text(help_text)
+        await update.message.reply_text(self._help_text)
 
     async def _handle_error(
         self,
@@ -173,7 +208,7 @@ class ClaudeTelegramBot:
             update: Telegram update object.
             context: Bot context with error info.
         """
-        logger.error(f"Error handling update: {context.error}")
+        logger.error("Error handling update: %s", context.error)
 
         if isinstance(update, Update) and update.message:
             await update.message.reply_text(
@@ -182,25 +217,15 @@ class ClaudeTelegramBot:
 
     async def _set_commands(self) -> None:
         """Set bot commands for Telegram menu."""
-        # Base commands
-        commands = [
-            BotCommand("start", "Welcome message"),
-            BotCommand("help", "Show help"),
-            BotCommand("clear", "Clear session and start new"),
-        ]
-
-        # Add custom commands dynamically
-        for cmd, desc in sorted(self.config.custom_commands.items()):
-            # Telegram limits description to 256 chars
-            commands.append(BotCommand(cmd, desc[:256]))
+        commands = self._bot_commands
 
         try:
             await self.application.bot.set_my_commands(commands)
             logger.info(
-                f"Bot commands set successfully ({len(commands)} commands)"
+                "Bot commands set successfully (%d commands)", len(commands)
             )
         except Exception as e:
-            logger.error(f"Failed to set bot commands: {e}")
+            logger.error("Failed to set bot commands: %s", e)
 
     def run(self) -> None:
         """Start the bot."""
@@ -210,7 +235,13 @@ class ClaudeTelegramBot:
         async def post_init(app: Application) -> None:
             await self._set_commands()
 
+        # Stop persistent Claude processes and save sessions on shutdown
+        async def post_shutdown(app: Application) -> None:
+            await self.claude_runner.close()
+            self.session_manager.flush()
+
         self.application.post_init = post_init
+        self.application.post_shutdown = post_shutdown
 
         # Run polling
         self.application.run_polling(
@@ -3,11 +3,37 @@
 import asyncio
 import json
 import logging
+import re
+import shutil
+import weakref
 from pathlib import Path
 from typing import Optional
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+# Substrings any stream-json event we care about contains; the decoded
+# "type" field decides. Matching without the key tolerates any spacing.
+_RESULT_MARKER = b'"result"'
+_ASSISTANT_MARKER = b'"assistant"'
+
+# Max line length for the stdout stream (tool results can be large)
+_STREAM_LIMIT = 16 * 1024 * 1024
+
+# Bytes of stderr kept from persistent processes for error reporting
+_STDERR_TAIL = 4096
+
+# CLI error printed when --input-format isn't a known option
+_UNSUPPORTED_INPUT_RE = re.compile(
+    r"(unknown|unrecognized) (option|argument).*input-format", re.IGNORECASE
+)
+
 
 class ClaudeExecutionError(Exception):
     """Claude CLI execution failed."""
@@ -15,8 +41,125 @@ class ClaudeExecutionError(Exception):
     pass
 
 
+class _StreamJsonParser:
+    """Incrementally parse streaming JSON output from Claude CLI.
+
+    The CLI outputs JSON objects line by line. Lines are handled as raw
+    bytes: only assistant messages and the final result are decoded;
+    other events are skipped by a cheap substring check. Only the latest
+    response text is kept.
+    """
+
+    def __init__(self) -> None:
+        """Initialize parser state."""
+        self.response_text: str = ""
+        self.finished: bool = False
+
+    def feed(self, line: bytes) -> None:
+        """Consume a single line of CLI output.
+
+        Args:
+            line: One raw line of stdout, without the trailing newline.
+        """
+        # Avoid copying the line: CLI events start with "{" at column 0
+        if not line or line.isspace():
+            return
+
+        if not line.startswith(b"{") and not line.lstrip().startswith(b"{"):
+            # Not JSON, might be plain text output
+            if not self.response_text:
+                self.response_text = line.decode(errors="replace")
+            return
+
+        # Skip decoding events that can't carry response text
+        if _RESULT_MARKER not in line and _ASSISTANT_MARKER not in line:
+            return
+
+        try:
+            data = _json_loads(line)
+        except json.JSONDecodeError:
+            return
+
+        # Handle different message types
+        msg_type = data.get("type")
+
+        if msg_type == "assistant":
+            # Assistant message with nested content
+            message = data.get("message", {})
+            if isinstance(message, dict):
+                content = message.get("content", [])
+                for block in content:
+                    if isinstance(block, dict) and block.get("type") == "text":
+                        text = block.get("text", "")
+                        if text:
+                            self.response_text = text
+
+        elif msg_type == "result":
+            # Final result - this is the complete response
+            self.finished = True
+            result = data.get("result", "")
+            if result and isinstance(result, str):
+                self.response_text = result
+
+
+class _PersistentProcess:
+    """Long-lived Claude CLI process serving one session over stdin."""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        """Wrap a running process and start draining its stderr.
+
+        Args:
+            process: Claude CLI started with --input-format stream-json.
+        """
+        self.process = process
+        self.turns = 0
+        # Pending idle-timeout callback, set between turns
+        self.idle_handle: Optional[asyncio.TimerHandle] = None
+        self._stderr = bytearray()
+        self._stderr_task = asyncio.create_task(self._drain_stderr())
+
+    async def _drain_stderr(self) -> None:
+        """Keep the tail of stderr so the pipe never fills up."""
+        while chunk := await self.process.stderr.read(_STDERR_TAIL):
+            self._stderr += chunk
+            del self._stderr[:-_STDERR_TAIL]
+
+    @property
+    def alive(self) -> bool:
+        """Whether the process is still running."""
+        return self.process.returncode is None
+
+    def stderr_text(self) -> str:
+        """Return the captured stderr tail."""
+        return self._stderr.decode(errors="replace")
+
+    async def close(self) -> None:
+        """Close stdin and wait for the process to exit."""
+        if self.idle_handle:
+            self.idle_handle.cancel()
+        if self.alive:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=5.0)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        # Collect the rest of stderr for error reporting
+        try:
+            await asyncio.wait_for(self._stderr_task, timeout=1.0)
+        except asyncio.TimeoutError:
+            pass
+
+
 class ClaudeRunner:
-    """Execute Claude Code CLI commands."""
+    """Execute Claude Code CLI commands.
+
+    Messages with a session ID are sent to a long-lived CLI process per
+    session (``--input-format stream-json``), avoiding a process spawn per
+    message. If the CLI can't run in that mode, the runner falls back to
+    one process per message. Processes idle for ``idle_timeout`` seconds
+    are stopped and resumed on the session's next message.
+    """
 
     def __init__(
         self,
@@ -24,6 +167,7 @@ class ClaudeRunner:
         claude_binary: str = "claude",
         timeout: float = 300.0,
         model: Optional[str] = None,
+        idle_timeout: float = 600.0,
     ):
         """Initialize Claude runner.
 
@@ -32,33 +176,52 @@ class ClaudeRunner:
             claude_binary: Path to claude CLI binary.
             timeout: Maximum execution time in seconds.
             model: Claude model to use (e.g., "sonnet", "opus", "haiku").
+            idle_timeout: Seconds before an idle persistent process is stopped.
+
+        Raises:
+            ClaudeExecutionError: If the claude binary can't be found.
         """
+        # Resolve through PATH once instead of on every spawn
+        resolved_binary = shutil.which(claude_binary)
+        if resolved_binary is None:
+            raise ClaudeExecutionError(
+                f"Claude CLI not found: {claude_binary}. "
+                "Make sure Claude Code is installed and in PATH."
+            )
+
         self.project_dir = project_dir
-        self.claude_binary = claude_binary
+        self.claude_binary = resolved_binary
         self.timeout = timeout
         self.model = model
+        self.idle_timeout = idle_timeout
 
-        logger.info(f"Claude model: {model or 'default'}")
+        # Persistent processes and their locks, keyed by session ID. A lock
+        # lives as long as some caller holds or waits for it.
+        self._persistent = True
+        self._processes: dict[str, _PersistentProcess] = {}
+        self._locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+        # Running idle-timeout shutdowns, referenced until they finish
+        self._idle_tasks: set[asyncio.Task] = set()
 
-    async def run(
+        logger.info("Claude model: %s", model or "default")
+
+    def _build_command(
         self,
-        message: str,
-        session_id: Optional[str] = None,
-        resume: bool = False,
-    ) -> str:
-        """Run Claude Code CLI and return the response.
+        session_id: Optional[str],
+        resume: bool,
+        streaming_input: bool,
+    ) -> list[str]:
+        """Build the Claude CLI argument list.
 
         Args:
-            message: The message/prompt to send to Claude.
             session_id: Session ID for conversation continuity.
             resume: If True, use --resume instead of --session-id.
+            streaming_input: If True, read messages from stdin as stream-json.
 
         Returns:
-            Claude's response text.
-
-        Raises:
-            ClaudeExecutionError: If Claude CLI fails.
-            asyncio.TimeoutError: If execution exceeds timeout.
+            Command arguments, without the prompt.
         """
         cmd = [self.claude_binary]
 
@@ -75,41 +238,43 @@ class ClaudeRunner:
         # Skip permission prompts (safe: bot already has authorized users check)
         cmd.append("--dangerously-skip-permissions")
 
-        # Add output flags and message (--verbose required for stream-json)
-        cmd.extend(["-p", "--verbose", "--output-format", "stream-json", message])
+        # Add output flags (--verbose required for stream-json)
+        cmd.extend(["-p", "--verbose", "--output-format", "stream-json"])
+
+        if streaming_input:
+            cmd.extend(["--input-format", "stream-json"])
+
+        return cmd
+
+    async def _spawn(
+        self,
+        cmd: list[str],
+        stdin: Optional[int] = None,
+    ) -> asyncio.subprocess.Process:
+        """Start the Claude CLI.
+
+        Args:
+            cmd: Command arguments.
+            stdin: stdin setting for the subprocess.
+
+        Returns:
+            The running process.
 
-        logger.debug(f"Running command: {' '.join(cmd[:5])}...")
-        logger.debug(f"Working directory: {self.project_dir}")
+        Raises:
+            ClaudeExecutionError: If the binary can't be executed.
+        """
+        logger.debug("Running command: %s...", " ".join(cmd[:5]))
+        logger.debug("Working directory: %s", self.project_dir)
 
         try:
-            process = await asyncio.create_subprocess_exec(
+            return await asyncio.create_subprocess_exec(
                 *cmd,
                 cwd=self.project_dir,
+                stdin=stdin,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
+                limit=_STREAM_LIMIT,
             )
-
-            try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
-                    timeout=self.timeout,
-                )
-            except asyncio.TimeoutError:
-                process.kill()
-                await process.wait()
-                raise asyncio.TimeoutError(
-                    f"Claude CLI timed out after {self.timeout} seconds"
-                )
-
-            if process.returncode != 0:
-                error_msg = stderr.decode() if stderr else "Unknown error"
-                logger.error(f"Claude CLI failed: {error_msg}")
-                raise ClaudeExecutionError(f"Claude CLI failed: {error_msg}")
-
-            # Parse streaming JSON output
-            response_text = self._parse_stream_json(stdout.decode())
-            return response_text
-
         except FileNotFoundError:
             raise ClaudeExecutionError(
                 f"Claude CLI not found: {self.claude_binary}. "
@@ -120,53 +285,293 @@ class ClaudeRunner:
                 f"Permission denied executing: {self.claude_binary}"
             )
 
-    def _parse_stream_json(self, output: str) -> str:
-        """Parse streaming JSON output from Claude CLI.
+    async def run(
+        self,
+        message: str,
+        session_id: Optional[str] = None,
+        resume: bool = False,
+    ) -> str:
+        """Run Claude Code CLI and return the response.
 
-        The CLI outputs JSON objects line by line.
-        We extract assistant message content.
+        Args:
+            message: The message/prompt to send to Claude.
+            session_id: Session ID for conversation continuity.
+            resume: If True, use --resume instead of --session-id.
+
+        Returns:
+            Claude's response text.
+
+        Raises:
+            ClaudeExecutionError: If Claude CLI fails.
+            asyncio.TimeoutError: If execution exceeds timeout.
+        """
+        if session_id and self._persistent:
+            async with self._lock(session_id):
+                response = await self._run_persistent(message, session_id, resume)
+            if response is not None:
+                return response
+            # Streaming input is unsupported: stop the processes of other sessions
+            for other_session_id in list(self._processes):
+                await self.close_session(other_session_id)
+
+        return await self._run_once(message, session_id, resume)
+
+    async def _run_once(
+        self,
+        message: str,
+        session_id: Optional[str],
+        resume: bool,
+    ) -> str:
+        """Run a single-message Claude CLI process.
 
         Args:
-            output: Raw stdout from Claude CLI.
+            message: The message/prompt to send to Claude.
+            session_id: Session ID for conversation continuity.
+            resume: If True, use --resume instead of --session-id.
 
         Returns:
-            Combined assistant response text.
+            Claude's response text.
         """
-        response_text: str = ""
+        cmd = self._build_command(session_id, resume, streaming_input=False)
+        cmd.append(message)
+        process = await self._spawn(cmd)
 
-        for line in output.strip().split("\n"):
-            if not line:
-                continue
+        # Drain stderr concurrently so the CLI never blocks on a full pipe
+        stderr_task = asyncio.create_task(process.stderr.read())
+        parser = _StreamJsonParser()
 
-            try:
-                data = json.loads(line)
-
-                # Handle different message types
-                msg_type = data.get("type")
-
-                if msg_type == "assistant":
-                    # Assistant message with nested content
-                    message = data.get("message", {})
-                    if isinstance(message, dict):
-                        content = message.get("content", [])
-                        for block in content:
-                            if isinstance(block, dict) and block.get("type") == "text":
-                                text = block.get("text", "")
-                                if text:
-                                    response_text = text
-
-                elif msg_type == "result":
-                    # Final result - this is the complete response
-                    result = data.get("result", "")
-                    if result and isinstance(result, str):
-                        response_text = result
-
-            except json.JSONDecodeError:
-                # Not JSON, might be plain text output
-                if line.strip() and not response_text:
-                    response_text = line
-
-        return response_text
+        try:
+            await asyncio.wait_for(
+                self._consume_stdout(process, parser),
+                timeout=self.timeout,
+            )
+            stderr = await stderr_task
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(
+                f"Claude CLI timed out after {self.timeout} seconds"
+            )
+        except ValueError:
+            # StreamReader raises this for lines longer than the limit
+            raise ClaudeExecutionError(
+                f"Claude CLI output line exceeded {_STREAM_LIMIT} bytes"
+            )
+        finally:
+            # Never leave the process or the stderr reader behind
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            stderr_task.cancel()
+
+        if process.returncode != 0:
+            error_msg = stderr.decode() if stderr else "Unknown error"
+            logger.error("Claude CLI failed: %s", error_msg)
+            raise ClaudeExecutionError(f"Claude CLI failed: {error_msg}")
+
+        return parser.response_text
+
+    async def _consume_stdout(
+        self,
+        process: asyncio.subprocess.Process,
+        parser: _StreamJsonParser,
+    ) -> None:
+        """Feed CLI stdout to the parser as lines arrive.
+
+        Args:
+            process: Running Claude CLI process.
+            parser: Parser accumulating the response.
+        """
+        async for raw in process.stdout:
+            parser.feed(raw.rstrip(b"\r\n"))
+        await process.wait()
+
+    async def _run_persistent(
+        self,
+        message: str,
+        session_id: str,
+        resume: bool,
+    ) -> Optional[str]:
+        """Send a message to the session's persistent Claude process.
+
+        Must be called with the session's lock held.
+
+        Args:
+            message: The message/prompt to send to Claude.
+            session_id: Session ID for conversation continuity.
+            resume: If True, use --resume when (re)starting the process.
+
+        Returns:
+            Claude's response text, or None if the CLI doesn't support
+            streaming input and the caller should fall back.
+
+        Raises:
+            ClaudeExecutionError: If the process exits without a result.
+            asyncio.TimeoutError: If the turn exceeds timeout.
+        """
+        persistent = self._processes.get(session_id)
+        if persistent is not None and persistent.idle_handle:
+            persistent.idle_handle.cancel()
+            persistent.idle_handle = None
+        if persistent is None or not persistent.alive:
+            cmd = self._build_command(session_id, resume, streaming_input=True)
+            process = await self._spawn(cmd, stdin=asyncio.subprocess.PIPE)
+            persistent = _PersistentProcess(process)
+            self._processes[session_id] = persistent
+
+        payload = {
+            "type": "user",
+            "message": {
+                "role": "user",
+                "content": [{"type": "text", "text": message}],
+            },
+        }
+        parser = _StreamJsonParser()
+
+        try:
+            persistent.process.stdin.write(json.dumps(payload).encode() + b"\n")
+            await persistent.process.stdin.drain()
+            await asyncio.wait_for(
+                self._consume_turn(persistent.process, parser),
+                timeout=self.timeout,
+            )
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(
+                f"Claude CLI timed out after {self.timeout} seconds"
+            )
+        except ValueError:
+            # StreamReader raises this for lines longer than the limit
+            raise ClaudeExecutionError(
+                f"Claude CLI output line exceeded {_STREAM_LIMIT} bytes"
+            )
+        finally:
+            # A process left mid-turn can't be reused: its stdout is out of sync
+            if not parser.finished:
+                if persistent.alive:
+                    persistent.process.kill()
+                await self._discard(session_id)
+
+        if parser.finished:
+            persistent.turns += 1
+            persistent.idle_handle = asyncio.get_running_loop().call_later(
+                self.idle_timeout,
+                self._expire_idle,
+                session_id,
+                persistent,
+                persistent.turns,
+            )
+            return parser.response_text
+
+        # Process exited before completing the turn
+        error_msg = persistent.stderr_text().strip() or "Unknown error"
+
+        if persistent.turns == 0 and _UNSUPPORTED_INPUT_RE.search(error_msg):
+            logger.warning(
+                "Persistent Claude process unavailable, "
+                "falling back to one process per message: %s",
+                error_msg,
+            )
+            self._persistent = False
+            return None
+
+        logger.error("Claude CLI failed: %s", error_msg)
+        raise ClaudeExecutionError(f"Claude CLI failed: {error_msg}")
+
+    async def _consume_turn(
+        self,
+        process: asyncio.subprocess.Process,
+        parser: _StreamJsonParser,
+    ) -> None:
+        """Feed CLI stdout to the parser until the turn's result arrives.
+
+        Args:
+            process: Persistent Claude CLI process.
+            parser: Parser accumulating the response.
+        """
+        while not parser.finished:
+            raw = await process.stdout.readline()
+            if not raw:
+                # EOF: process exited
+                return
+            parser.feed(raw.rstrip(b"\r\n"))
+
+    def _lock(self, session_id: str) -> asyncio.Lock:
+        """Return the lock serializing a session's persistent process.
+
+        Args:
+            session_id: Session ID.
+
+        Returns:
+            The session's lock; callers must keep a reference while using it.
+        """
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+
+    def _expire_idle(
+        self,
+        session_id: str,
+        persistent: _PersistentProcess,
+        turns: int,
+    ) -> None:
+        """Schedule stopping a persistent process that stayed idle.
+
+        Args:
+            session_id: Session ID owning the process.
+            persistent: Process that was idle when the timer was set.
+            turns: Its turn count at that time.
+        """
+        task = asyncio.create_task(self._close_idle(session_id, persistent, turns))
+        self._idle_tasks.add(task)
+        task.add_done_callback(self._idle_tasks.discard)
+
+    async def _close_idle(
+        self,
+        session_id: str,
+        persistent: _PersistentProcess,
+        turns: int,
+    ) -> None:
+        """Stop a persistent process unless it was used in the meantime.
+
+        Args:
+            session_id: Session ID owning the process.
+            persistent: Process that was idle when the timer was set.
+            turns: Its turn count at that time.
+        """
+        async with self._lock(session_id):
+            current = self._processes.get(session_id)
+            if current is persistent and persistent.turns == turns:
+                logger.debug("Stopping idle Claude process for session %s", session_id)
+                await self._discard(session_id)
+
+    async def _discard(self, session_id: str) -> None:
+        """Stop and forget a session's persistent process.
+
+        Args:
+            session_id: Session ID whose process should be stopped.
+        """
+        persistent = self._processes.pop(session_id, None)
+        if persistent:
+            await persistent.close()
+
+    async def close_session(self, session_id: str) -> None:
+        """Stop the persistent process for a session, if any.
+
+        Waits for a turn in progress to finish first.
+
+        Args:
+            session_id: Session ID whose process should be stopped.
+        """
+        async with self._lock(session_id):
+            await self._discard(session_id)
+
+    async def close(self) -> None:
+        """Stop all persistent processes."""
+        for task in list(self._idle_tasks):
+            task.cancel()
+        for session_id in list(self._processes):
+            await self._discard(session_id)
 
     async def run_command(
         self,
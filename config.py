@@ -1,17 +1,76 @@
 """Configuration loading from .env file."""
 
 import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
 
 from dotenv import load_dotenv
 import os
 
+# Only the head of each command file is read (front-matter lives at the top)
+_HEADER_READ_SIZE = 4096
+
+# Match YAML front-matter block: ---\n...\n---
+_FRONTMATTER_RE = re.compile(rb"^---\s*\n(.*?)\n---", re.DOTALL)
+
+# Match description: "..." line inside the front-matter block
+_DESC_RE = re.compile(rb"^description:\s*[\"'](.+?)[\"']\s*$", re.MULTILINE)
+
+# Loaded configs keyed by (env path, project dir, .env mtime, commands dir mtime)
+_CONFIG_CACHE: dict[tuple, "Config"] = {}
+
+
+def _mtime_ns(path: Path) -> int:
+    """Return path's modification time in ns, or 0 if it doesn't exist."""
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _parse_command_file(entry: os.DirEntry) -> tuple[str, str] | None:
+    """Parse a single command file.
+
+    Args:
+        entry: Directory entry for a .md command definition.
+
+    Returns:
+        Tuple of (command name, description), or None if unreadable.
+    """
+    # Command name: filename without .md, replace - with _
+    cmd_name = entry.name[:-3].replace("-", "_")
+
+    # Read file head in one read() and extract description from YAML front-matter
+    try:
+        fd = os.open(entry.path, os.O_RDONLY)
+        try:
+            head = os.read(fd, _HEADER_READ_SIZE)
+        finally:
+            os.close(fd)
+        # Files without front-matter skip all regex work
+        if not head.startswith(b"---"):
+            return cmd_name, cmd_name.replace("_", " ").title()
+        frontmatter = _FRONTMATTER_RE.match(head)
+        match = _DESC_RE.search(frontmatter.group(1)) if frontmatter else None
+        if match:
+            description = match.group(1).decode("utf-8")
+            # Remove emoji prefix if present (e.g., " - Ver saldos")
+            if " - " in description:
+                description = description.split(" - ", 1)[1]
+            return cmd_name, description
+        # Fallback: use command name as description
+        return cmd_name, cmd_name.replace("_", " ").title()
+    except Exception:
+        # Skip files that can't be read
+        return None
+
 
 def discover_commands(project_dir: Path) -> dict[str, str]:
     """Discover custom commands from .claude/commands/ directory.
 
     Reads all .md files and extracts the description from YAML front-matter.
+    Files are read concurrently since each one is independent I/O.
 
     Args:
         project_dir: Path to project root (where .claude/ lives).
@@ -23,34 +82,21 @@ def discover_commands(project_dir: Path) -> dict[str, str]:
     commands_dir = project_dir / ".claude" / "commands"
     commands = {}
 
-    if not commands_dir.exists():
+    # scandir yields names without a stat() per entry
+    try:
+        with os.scandir(commands_dir) as it:
+            md_files = [entry for entry in it if entry.name.endswith(".md")]
+    except OSError:
         return commands
 
-    for md_file in commands_dir.glob("*.md"):
-        # Command name: filename without .md, replace - with _
-        cmd_name = md_file.stem.replace("-", "_")
+    if not md_files:
+        return commands
 
-        # Read file and extract description from YAML front-matter
-        try:
-            content = md_file.read_text(encoding="utf-8")
-            # Match YAML front-matter: ---\ndescription: "..."\n---
-            match = re.search(
-                r'^---\s*\n.*?description:\s*["\'](.+?)["\']\s*\n.*?---',
-                content,
-                re.DOTALL,
-            )
-            if match:
-                description = match.group(1)
-                # Remove emoji prefix if present (e.g., " - Ver saldos")
-                if " - " in description:
-                    description = description.split(" - ", 1)[1]
+    with ThreadPoolExecutor(max_workers=min(32, len(md_files))) as executor:
+        for result in executor.map(_parse_command_file, md_files):
+            if result:
+                cmd_name, description = result
                 commands[cmd_name] = description
-            else:
-                # Fallback: use command name as description
-                commands[cmd_name] = cmd_name.replace("_", " ").title()
-        except Exception:
-            # Skip files that can't be read
-            continue
 
     return commands
 
@@ -60,13 +106,19 @@ class Config:
     """Bot configuration loaded from environment."""
 
     telegram_token: str
-    authorized_users: set[int]
+    authorized_users: frozenset[int]
     project_dir: Path
     sessions_file: Path
     custom_commands: dict[str, str] = field(default_factory=dict)
     bot_name: str = "Claude bot"
     claude_binary: str = "claude"
     claude_model: str | None = None
+    # custom_commands sorted by name, for menus and help texts
+    sorted_commands: tuple[tuple[str, str], ...] = field(init=False, default=())
+
+    def __post_init__(self) -> None:
+        """Precompute the sorted command list."""
+        self.sorted_commands = tuple(sorted(self.custom_commands.items()))
 
     @classmethod
     def load(cls, env_path: Path | None = None) -> "Config":
@@ -85,6 +137,25 @@ class Config:
             env_path = Path(env_path).resolve()
             if not env_path.exists():
                 raise ValueError(f".env file not found at: {env_path}")
+
+        # Determine project directory (where CLAUDE.md lives)
+        if env_path:
+            project_dir = env_path.parent.resolve()
+        else:
+            project_dir = Path.cwd().resolve()
+
+        # Reuse a previous load while .env and the commands dir are unchanged
+        cache_key = (
+            str(env_path),
+            project_dir,
+            _mtime_ns(env_path or project_dir / ".env"),
+            _mtime_ns(project_dir / ".claude" / "commands"),
+        )
+        cached = _CONFIG_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if env_path:
             load_dotenv(env_path)
         else:
             load_dotenv()
@@ -100,24 +171,16 @@ class Config:
         if not users_str:
             raise ValueError("TELEGRAM_AUTHORIZED_USERS not found in environment")
 
-        authorized_users = set()
-        for user_id in users_str.split(","):
-            user_id = user_id.strip()
-            if user_id:
-                try:
-                    authorized_users.add(int(user_id))
-                except ValueError:
-                    raise ValueError(f"Invalid user ID: {user_id}")
+        raw_ids = [uid for uid in (part.strip() for part in users_str.split(",")) if uid]
+        for user_id in raw_ids:
+            # Telegram IDs are integers; group/channel IDs are negative
+            if not user_id.removeprefix("-").isdecimal():
+                raise ValueError(f"Invalid user ID: {user_id}")
+        authorized_users = frozenset(map(int, raw_ids))
 
         if not authorized_users:
             raise ValueError("No authorized users configured")
 
-        # Determine project directory (where CLAUDE.md lives)
-        if env_path:
-            project_dir = env_path.parent.resolve()
-        else:
-            project_dir = Path.cwd().resolve()
-
         # Store sessions in user's home directory (writable in Docker)
         home_dir = Path.home()
         sessions_file = home_dir / ".telegram-sessions.json"
@@ -131,7 +194,7 @@ class Config:
         # Optional Claude model (e.g., "sonnet", "opus", "haiku")
         claude_model = os.getenv("CLAUDE_MODEL")
 
-        return cls(
+        config = cls(
             telegram_token=token,
             authorized_users=authorized_users,
             project_dir=project_dir,
@@ -140,3 +203,5 @@ class Config:
             bot_name=bot_name,
             claude_model=claude_model,
         )
+        _CONFIG_CACHE[cache_key] = config
+        return config
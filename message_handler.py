@@ -4,7 +4,7 @@ import asyncio
 import logging
 from typing import Optional
 
-from telegram import Update
+from telegram import Message, Update
 from telegram.constants import ChatAction
 from telegram.ext import ContextTypes
 
@@ -15,6 +15,7 @@ from utils import (
     format_chunks_with_markers,
     truncate_for_log,
     format_for_telegram,
+    is_safe_html,
 )
 
 logger = logging.getLogger(__name__)
@@ -27,7 +28,7 @@ class MessageHandler:
         self,
         claude_runner: ClaudeRunner,
         session_manager: SessionManager,
-        authorized_users: set[int],
+        authorized_users: frozenset[int] | set[int],
     ):
         """Initialize message handler.
 
@@ -62,25 +63,27 @@ class MessageHandler:
             update: Telegram update object.
             context: Bot context.
         """
-        if not update.effective_user or not update.message:
+        user = update.effective_user
+        msg = update.message
+        if not user or not msg:
             return
 
-        user_id = update.effective_user.id
-        username = update.effective_user.username or str(user_id)
+        user_id = user.id
+        username = user.username or str(user_id)
 
         # Authorization check
         if not self.is_authorized(user_id):
-            logger.warning(f"Unauthorized access attempt from user {user_id}")
-            await update.message.reply_text("Not authorized.")
+            logger.warning("Unauthorized access attempt from user %s", user_id)
+            await msg.reply_text("Not authorized.")
             return
 
-        message_text = update.message.text
+        message_text = msg.text
         if not message_text:
             return
 
-        logger.info(f"Message from {username}: {truncate_for_log(message_text)}")
+        logger.info("Message from %s: %s", username, truncate_for_log(message_text))
 
-        await self._process_with_claude(update, context, message_text)
+        await self._process_with_claude(msg, context, user_id, message_text)
 
     async def handle_command(
         self,
@@ -95,104 +98,111 @@ class MessageHandler:
             context: Bot context.
             command: Command name (e.g., "balance", "gastos").
         """
-        if not update.effective_user or not update.message:
+        user = update.effective_user
+        msg = update.message
+        if not user or not msg:
             return
 
-        user_id = update.effective_user.id
-        username = update.effective_user.username or str(user_id)
+        user_id = user.id
+        username = user.username or str(user_id)
 
         # Authorization check
         if not self.is_authorized(user_id):
-            logger.warning(f"Unauthorized command attempt from user {user_id}")
-            await update.message.reply_text("Not authorized.")
+            logger.warning("Unauthorized command attempt from user %s", user_id)
+            await msg.reply_text("Not authorized.")
             return
 
-        logger.info(f"Command /{command} from {username}")
+        logger.info("Command /%s from %s", command, username)
 
         # Commands are sent as slash commands to Claude
         # Convert underscore back to hyphen (Telegram uses _ but Claude uses -)
         claude_command = command.replace("_", "-")
-        await self._process_with_claude(update, context, f"/{claude_command}")
+        await self._process_with_claude(msg, context, user_id, f"/{claude_command}")
 
     async def _process_with_claude(
         self,
-        update: Update,
+        msg: Message,
         context: ContextTypes.DEFAULT_TYPE,
+        user_id: int,
         message: str,
     ) -> None:
         """Process message through Claude CLI.
 
         Args:
-            update: Telegram update object.
+            msg: Incoming Telegram message to reply to.
             context: Bot context.
+            user_id: Telegram user ID of the sender.
             message: Message to send to Claude.
         """
-        user_id = update.effective_user.id
+        chat_id = msg.chat_id
 
         # Get or create session
         session, is_existing = self.session_manager.get_or_create_session(user_id)
         logger.debug(
-            f"Session for {user_id}: {session.session_id} "
-            f"(existing={is_existing}, messages={session.message_count})"
+            "Session for %s: %s (existing=%s, messages=%d)",
+            user_id,
+            session.session_id,
+            is_existing,
+            session.message_count,
         )
 
         # Send typing indicator
-        await self._send_typing(update, context)
+        await self._send_typing(context, chat_id)
 
         try:
             # Run Claude with typing indicator refresh
             response = await self._run_with_typing(
-                update, context, message, session.session_id, is_existing
+                context, chat_id, message, session.session_id, is_existing
             )
 
             # Update session
             self.session_manager.update_session(user_id)
 
             # Send response
-            await self._send_response(update, response)
+            await self._send_response(msg, response)
 
         except asyncio.TimeoutError:
-            logger.error(f"Timeout processing message for user {user_id}")
-            await update.message.reply_text(
+            logger.error("Timeout processing message for user %s", user_id)
+            await msg.reply_text(
                 "The operation took too long. "
                 "Try again or use /clear to start over."
             )
         except ClaudeExecutionError as e:
-            logger.error(f"Claude error for user {user_id}: {e}")
-            await update.message.reply_text(
+            logger.error("Claude error for user %s: %s", user_id, e)
+            await msg.reply_text(
                 f"Error executing Claude: {e}\n\n"
                 "Use /clear to start a new session."
             )
         except Exception as e:
-            logger.exception(f"Unexpected error for user {user_id}: {e}")
-            await update.message.reply_text(
+            logger.exception("Unexpected error for user %s: %s", user_id, e)
+            await msg.reply_text(
                 "An unexpected error occurred. "
                 "Try again or use /clear to start over."
             )
 
     async def _send_typing(
         self,
-        update: Update,
         context: ContextTypes.DEFAULT_TYPE,
+        chat_id: int,
     ) -> None:
         """Send typing indicator.
 
         Args:
-            update: Telegram update object.
             context: Bot context.
+            chat_id: Chat to show the indicator in.
         """
         try:
             await context.bot.send_chat_action(
-                chat_id=update.effective_chat.id,
+                chat_id=chat_id,
                 action=ChatAction.TYPING,
             )
         except Exception as e:
-            logger.debug(f"Failed to send typing indicator: {e}")
+            logger.debug("Failed to send typing indicator: %s", e)
 
     async def _run_with_typing(
         self,
-        update: Update,
         context: ContextTypes.DEFAULT_TYPE,
+        chat_id: int,
         message: str,
         session_id: str,
         resume: bool,
@@ -200,8 +210,8 @@ class MessageHandler:
         """Run Claude while periodically refreshing typing indicator.
 
         Args:
-            update: Telegram update object.
             context: Bot context.
+            chat_id: Chat to show the indicator in.
             message: Message to send to Claude.
             session_id: Session ID.
             resume: Whether to resume existing session.
@@ -215,10 +225,13 @@ class MessageHandler:
         )
 
         # Refresh typing every 4 seconds while waiting
-        while not claude_task.done():
-            await self._send_typing(update, context)
+        done = asyncio.Event()
+        claude_task.add_done_callback(lambda _: done.set())
+
+        while not done.is_set():
+            await self._send_typing(context, chat_id)
             try:
-                await asyncio.wait_for(asyncio.shield(claude_task), timeout=4.0)
+                await asyncio.wait_for(done.wait(), timeout=4.0)
             except asyncio.TimeoutError:
                 continue
 
@@ -226,33 +239,43 @@ class MessageHandler:
 
     async def _send_response(
         self,
-        update: Update,
+        msg: Message,
         response: str,
     ) -> None:
         """Send response, splitting if necessary.
 
         Args:
-            update: Telegram update object.
+            msg: Incoming Telegram message to reply to.
             response: Response text to send.
         """
         if not response.strip():
             response = "(No response from Claude)"
 
         # Format for Telegram (wrap tables in code blocks, convert headers)
-        response = format_for_telegram(response)
+        formatted = format_for_telegram(response)
 
         # Split long messages
-        chunks = split_message(response)
-        chunks = format_chunks_with_markers(chunks)
+        chunks = format_chunks_with_markers(split_message(formatted))
+
+        # Pick parse mode once; unbalanced tags would make Telegram reject it
+        parse_mode = "HTML"
+        if not all(is_safe_html(chunk) for chunk in chunks):
+            logger.warning(
+                "Formatted response has unbalanced HTML, sending as plain text"
+            )
+            parse_mode = None
+            chunks = format_chunks_with_markers(split_message(response))
 
         for chunk in chunks:
             try:
-                await update.message.reply_text(chunk, parse_mode="HTML")
+                await msg.reply_text(chunk, parse_mode=parse_mode)
             except Exception as e:
-                logger.error(f"Failed to send HTML message: {e}")
+                logger.error("Failed to send message: %s", e)
+                if parse_mode is None:
+                    continue
                 # Try plain text fallback
                 try:
-                    await update.message.reply_text(
+                    await msg.reply_text(
                         chunk[:4000],
                         parse_mode=None,
                     )
@@ -270,22 +293,29 @@ class MessageHandler:
             update: Telegram update object.
             context: Bot context.
         """
-        if not update.effective_user or not update.message:
+        user = update.effective_user
+        msg = update.message
+        if not user or not msg:
             return
 
-        user_id = update.effective_user.id
+        user_id = user.id
 
         if not self.is_authorized(user_id):
-            await update.message.reply_text("Not authorized.")
+            await msg.reply_text("Not authorized.")
             return
 
+        # Stop the session's persistent Claude process along with it
+        session = self.session_manager.get_session(user_id)
+        if session:
+            await self.claude_runner.close_session(session.session_id)
+
         cleared = self.session_manager.clear_session(user_id)
         if cleared:
-            logger.info(f"Session cleared for user {user_id}")
-            await update.message.reply_text(
+            logger.info("Session cleared for user %s", user_id)
+            await msg.reply_text(
                 "Session cleared. The next message will start a new conversation."
             )
         else:
-            await update.message.reply_text(
+            await msg.reply_text(
                 "No active session."
             )
@@ -1,14 +1,53 @@
 """Session management for maintaining conversation context per user."""
 
+import asyncio
+import atexit
 import json
+import os
+import sys
+import time
 import uuid
-from dataclasses import dataclass, asdict
-from datetime import datetime
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from types import MappingProxyType
+from typing import Mapping, Optional
 
+try:
+    import orjson
 
-@dataclass
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(data: dict) -> bytes:
+        """Serialize data as compact single-line JSON."""
+        return json.dumps(data, separators=(",", ":")).encode()
+
+# Seconds to coalesce session changes before writing them to disk
+SAVE_DEBOUNCE_SECONDS = 1.0
+
+# Log lines tolerated before compacting (besides 2x the live sessions)
+COMPACT_MIN_LINES = 1000
+
+# Last formatted timestamp: [epoch second, ISO string]
+_ts_cache: list = [0, ""]
+
+
+def _utcnow_iso() -> str:
+    """Return the current UTC time as an ISO 8601 string.
+
+    Second granularity is enough for session bookkeeping, so the string
+    is formatted once per second and reused.
+    """
+    now = int(time.time())
+    if now != _ts_cache[0]:
+        _ts_cache[0] = now
+        _ts_cache[1] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+    return _ts_cache[1]
+
+
+@dataclass(slots=True)
 class SessionInfo:
     """Information about a user's session."""
 
@@ -17,56 +56,234 @@ class SessionInfo:
     last_used: str
     message_count: int = 0
 
+    def __post_init__(self) -> None:
+        """Intern the session ID so repeated copies share one object."""
+        self.session_id = sys.intern(self.session_id)
+
     def touch(self) -> None:
         """Update last_used timestamp and increment message count."""
-        self.last_used = datetime.utcnow().isoformat() + "Z"
+        self.last_used = _utcnow_iso()
         self.message_count += 1
 
+    def to_dict(self) -> dict:
+        """Return fields as a plain dict for serialization.
+
+        Cheaper than dataclasses.asdict, which deep-copies every value.
+        """
+        return {
+            "session_id": self.session_id,
+            "created_at": self.created_at,
+            "last_used": self.last_used,
+            "message_count": self.message_count,
+        }
+
 
 class SessionManager:
-    """Manage Claude Code session IDs per Telegram user."""
+    """Manage Claude Code session IDs per Telegram user.
+
+    Sessions are persisted as an append-only JSONL log: one
+    {"u": user_id, "s": session} record per change, with "s": null for a
+    cleared session. On load, later records for a user win. The log is
+    rewritten with one line per live session once it grows too long.
+    """
 
     def __init__(self, sessions_file: Path):
         """Initialize session manager.
 
         Args:
-            sessions_file: Path to JSON file for session persistence.
+            sessions_file: Path to JSONL file for session persistence.
         """
         self.sessions_file = sessions_file
         self._sessions: dict[int, SessionInfo] = {}
+        # Read-only live view handed out by get_all_sessions
+        self._sessions_view = MappingProxyType(self._sessions)
+        # Serialized form of every session, keyed by str user ID. Kept in
+        # sync by the mutators so saving needs no per-user conversion.
+        self._sessions_raw: dict[str, dict] = {}
+        # Latest unsaved record per user (None means cleared)
+        self._pending: dict[int, Optional[dict]] = {}
+        # Lines currently in the log file, to decide when to compact
+        self._log_lines = 0
+        self._needs_compaction = False
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
         self._load()
 
+        # Pending changes must reach disk even if the process exits early
+        atexit.register(self.flush)
+
     def _load(self) -> None:
-        """Load sessions from JSON file."""
-        if not self.sessions_file.exists():
+        """Load sessions from the JSONL log.
+
+        Entries are kept as raw dicts; SessionInfo objects are only built
+        for users that are actually accessed (see _materialize). Corrupt
+        lines (e.g. a write torn by a crash) are skipped individually.
+        """
+        try:
+            content = self.sessions_file.read_bytes()
+        except IOError:
             return
 
+        if not content.startswith(b'{"u"') and self._load_legacy(content):
+            return
+
+        # A torn last line would swallow the next append; rewrite instead
+        if content and not content.endswith(b"\n"):
+            self._needs_compaction = True
+
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = _json_loads(line)
+                user_key = str(int(record["u"]))
+                session_data = record["s"]
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                continue
+
+            self._log_lines += 1
+            if isinstance(session_data, dict):
+                self._sessions_raw[user_key] = session_data
+            else:
+                self._sessions_raw.pop(user_key, None)
+
+    def _load_legacy(self, content: bytes) -> bool:
+        """Load a sessions file in the old single-object format.
+
+        Args:
+            content: Raw file content.
+
+        Returns:
+            True if content was a {"users": {...}} object.
+        """
         try:
-            with open(self.sessions_file, "r") as f:
-                data = json.load(f)
-
-            users = data.get("users", {})
-            for user_id_str, session_data in users.items():
-                try:
-                    user_id = int(user_id_str)
-                    self._sessions[user_id] = SessionInfo(**session_data)
-                except (ValueError, TypeError):
-                    continue
-        except (json.JSONDecodeError, IOError):
-            # Start fresh if file is corrupted
-            self._sessions = {}
+            data = _json_loads(content)
+        except json.JSONDecodeError:
+            return False
+
+        if not isinstance(data, dict) or not isinstance(data.get("users"), dict):
+            return False
+
+        self._sessions_raw = data["users"]
+        # Appending to the old format would corrupt it; rewrite on next save
+        self._needs_compaction = True
+        return True
+
+    def _materialize(self, user_id: int) -> Optional[SessionInfo]:
+        """Build the SessionInfo for a user loaded from disk.
+
+        Args:
+            user_id: Telegram user ID.
+
+        Returns:
+            SessionInfo if a valid entry was loaded, None otherwise.
+        """
+        session_data = self._sessions_raw.get(str(user_id))
+        if session_data is None:
+            return None
+
+        try:
+            session = SessionInfo(**session_data)
+        except TypeError:
+            # Drop malformed entries
+            del self._sessions_raw[str(user_id)]
+            return None
+
+        self._sessions[user_id] = session
+        return session
 
     def _save(self) -> None:
-        """Persist sessions to JSON file."""
-        data = {
-            "users": {
-                str(user_id): asdict(session)
-                for user_id, session in self._sessions.items()
-            }
-        }
+        """Persist pending session changes.
+
+        Appends one record per changed user, or compacts the log when it
+        has grown well past the number of live sessions. Does nothing if
+        no change happened since the last save.
+        """
+        if not self._pending:
+            return
+
+        compact_at = max(COMPACT_MIN_LINES, 2 * len(self._sessions_raw))
+        if self._needs_compaction or self._log_lines + len(self._pending) > compact_at:
+            self._compact()
+        else:
+            payload = b"".join(
+                _json_dumps({"u": user_id, "s": data}) + b"\n"
+                for user_id, data in self._pending.items()
+            )
+            try:
+                with open(self.sessions_file, "ab") as f:
+                    f.write(payload)
+            except OSError:
+                # A partial write leaves a torn line; rewrite on the next save
+                self._needs_compaction = True
+                raise
+            self._log_lines += len(self._pending)
 
-        with open(self.sessions_file, "w") as f:
-            json.dump(data, f, indent=2)
+        self._pending.clear()
+
+    def _compact(self) -> None:
+        """Rewrite the log with one record per live session.
+
+        Writes to a temporary file first and swaps it in, so a crash
+        mid-write never leaves a truncated sessions file behind.
+        """
+        lines = []
+        for user_key, data in self._sessions_raw.items():
+            try:
+                user_id = int(user_key)
+            except ValueError:
+                continue
+            lines.append(_json_dumps({"u": user_id, "s": data}) + b"\n")
+
+        tmp_file = self.sessions_file.with_suffix(self.sessions_file.suffix + ".tmp")
+        try:
+            tmp_file.write_bytes(b"".join(lines))
+            os.replace(tmp_file, self.sessions_file)
+        except OSError:
+            # Don't leave a partial temp file behind
+            tmp_file.unlink(missing_ok=True)
+            raise
+
+        self._log_lines = len(lines)
+        self._needs_compaction = False
+
+    def _record(self, user_id: int, data: Optional[dict]) -> None:
+        """Apply a session change and schedule it for saving.
+
+        Args:
+            user_id: Telegram user ID.
+            data: Serialized session, or None if it was cleared.
+        """
+        if data is None:
+            self._sessions_raw.pop(str(user_id), None)
+        else:
+            self._sessions_raw[str(user_id)] = data
+        self._pending[user_id] = data
+        self._mark_dirty()
+
+    def _mark_dirty(self) -> None:
+        """Schedule a coalesced save of pending changes.
+
+        Inside an event loop, changes within SAVE_DEBOUNCE_SECONDS share
+        one write. Without a running loop, saves immediately.
+        """
+        if self._flush_handle is not None:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+
+        self._flush_handle = loop.call_later(SAVE_DEBOUNCE_SECONDS, self.flush)
+
+    def flush(self) -> None:
+        """Write pending session changes to disk, if any."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        self._save()
 
     def get_session(self, user_id: int) -> Optional[SessionInfo]:
         """Get existing session for user.
@@ -77,7 +294,10 @@ class SessionManager:
         Returns:
             SessionInfo if exists, None otherwise.
         """
-        return self._sessions.get(user_id)
+        session = self._sessions.get(user_id)
+        if session is None:
+            session = self._materialize(user_id)
+        return session
 
     def create_session(self, user_id: int) -> SessionInfo:
         """Create new session for user.
@@ -88,15 +308,16 @@ class SessionManager:
         Returns:
             Newly created SessionInfo.
         """
-        now = datetime.utcnow().isoformat() + "Z"
+        now = _utcnow_iso()
         session = SessionInfo(
+            # Must stay a dashed UUID: the CLI rejects other --session-id values
             session_id=str(uuid.uuid4()),
             created_at=now,
             last_used=now,
             message_count=0,
         )
         self._sessions[user_id] = session
-        self._save()
+        self._record(user_id, session.to_dict())
         return session
 
     def get_or_create_session(self, user_id: int) -> tuple[SessionInfo, bool]:
@@ -119,10 +340,10 @@ class SessionManager:
         Args:
             user_id: Telegram user ID.
         """
-        session = self._sessions.get(user_id)
+        session = self.get_session(user_id)
         if session:
             session.touch()
-            self._save()
+            self._record(user_id, session.to_dict())
 
     def clear_session(self, user_id: int) -> bool:
         """Clear session for user.
@@ -133,16 +354,30 @@ class SessionManager:
         Returns:
             True if session existed and was cleared, False otherwise.
         """
-        if user_id in self._sessions:
-            del self._sessions[user_id]
-            self._save()
+        self._sessions.pop(user_id, None)
+        if str(user_id) in self._sessions_raw:
+            self._record(user_id, None)
             return True
         return False
 
-    def get_all_sessions(self) -> dict[int, SessionInfo]:
+    def get_all_sessions(self) -> Mapping[int, SessionInfo]:
         """Get all active sessions.
 
         Returns:
-            Dict mapping user_id to SessionInfo.
+            Read-only live view mapping user_id to SessionInfo. Call
+            dict() on it for a snapshot that won't change.
         """
-        return self._sessions.copy()
+        # Everything already materialized: skip the O(N) pass
+        if len(self._sessions) == len(self._sessions_raw):
+            return self._sessions_view
+
+        for user_id_str in list(self._sessions_raw):
+            try:
+                user_id = int(user_id_str)
+            except ValueError:
+                # Not a user ID; drop it
+                del self._sessions_raw[user_id_str]
+                continue
+            if user_id not in self._sessions:
+                self._materialize(user_id)
+        return self._sessions_view
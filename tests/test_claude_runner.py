@@ -0,0 +1,173 @@
+"""Tests for claude_runner."""
+
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+from claude_runner import ClaudeExecutionError, ClaudeRunner, _StreamJsonParser
+
+
+@pytest.mark.parametrize("separators", [(",", ":"), (", ", ": ")])
+def test_parser_tolerates_json_spacing(separators):
+    """Events are recognized whether or not the CLI puts spaces after colons."""
+    events = [
+        {"type": "system", "subtype": "init"},
+        {
+            "type": "assistant",
+            "message": {"content": [{"type": "text", "text": "hi"}]},
+        },
+    ]
+    parser = _StreamJsonParser()
+    for event in events:
+        parser.feed(json.dumps(event, separators=separators).encode())
+    assert parser.response_text == "hi"
+    assert not parser.finished
+
+    result = {"type": "result", "result": "done"}
+    parser.feed(json.dumps(result, separators=separators).encode())
+    assert parser.finished
+    assert parser.response_text == "done"
+
+
+FAKE_CLAUDE = """\
+import json, os, sys, time
+
+args = sys.argv[1:]
+with open(os.environ["FAKE_CLAUDE_LOG"], "a") as log:
+    log.write(" ".join(args) + "\\n")
+
+if "--input-format" not in args:
+    print(json.dumps({"type": "result", "result": "once: " + args[-1]}))
+    sys.exit(0)
+
+if os.environ.get("FAKE_CLAUDE_NO_STREAM"):
+    print("error: unknown option '--input-format'", file=sys.stderr)
+    sys.exit(1)
+
+turn = 0
+for line in sys.stdin:
+    text = json.loads(line)["message"]["content"][0]["text"]
+    if text == "die":
+        print("crashed", file=sys.stderr)
+        sys.exit(3)
+    if text == "slow":
+        time.sleep(0.2)
+    turn += 1
+    reply = f"{os.getpid()}:{turn}:{text}"
+    print(json.dumps({"type": "result", "result": reply}), flush=True)
+"""
+
+
+@pytest.fixture
+def fake_claude(tmp_path, monkeypatch):
+    """Put a fake claude CLI on PATH; return the file logging its spawns."""
+    script = tmp_path / "claude"
+    script.write_text(f"#!{sys.executable}\n{FAKE_CLAUDE}")
+    script.chmod(0o755)
+    log = tmp_path / "spawns.log"
+    log.touch()
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_CLAUDE_LOG", str(log))
+    return log
+
+
+def _spawns(log) -> list[str]:
+    """Return the argument lines of every fake CLI spawn."""
+    return log.read_text().splitlines()
+
+
+def test_persistent_process_serves_several_turns(fake_claude, tmp_path):
+    """Turns of one session go to a single long-lived process."""
+
+    async def scenario():
+        runner = ClaudeRunner(tmp_path)
+        try:
+            first = await runner.run("a", "s1")
+            second = await runner.run("b", "s1")
+        finally:
+            await runner.close()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    pid, turn, text = first.split(":")
+    assert (turn, text) == ("1", "a")
+    assert second == f"{pid}:2:b"
+    assert len(_spawns(fake_claude)) == 1
+
+
+def test_concurrent_runs_on_one_session_are_serialized(fake_claude, tmp_path):
+    """Concurrent messages for a session take turns on its process."""
+
+    async def scenario():
+        runner = ClaudeRunner(tmp_path)
+        try:
+            return await asyncio.gather(
+                runner.run("slow", "s1"), runner.run("slow", "s1")
+            )
+        finally:
+            await runner.close()
+
+    replies = asyncio.run(scenario())
+    assert sorted(reply.split(":")[1] for reply in replies) == ["1", "2"]
+    assert len(_spawns(fake_claude)) == 1
+
+
+def test_idle_process_is_stopped_and_resumed(fake_claude, tmp_path):
+    """An idle process is stopped; the next message resumes the session."""
+
+    async def scenario():
+        runner = ClaudeRunner(tmp_path, idle_timeout=0.1)
+        try:
+            await runner.run("a", "s1")
+            await asyncio.sleep(0.5)
+            stopped = "s1" not in runner._processes
+            reply = await runner.run("b", "s1", resume=True)
+        finally:
+            await runner.close()
+        return stopped, reply
+
+    stopped, reply = asyncio.run(scenario())
+    assert stopped
+    assert reply.endswith(":1:b")
+    spawns = _spawns(fake_claude)
+    assert len(spawns) == 2
+    assert "--resume s1" in spawns[1]
+
+
+def test_unsupported_streaming_input_falls_back(
+    fake_claude, tmp_path, monkeypatch
+):
+    """A CLI rejecting --input-format switches to one process per message."""
+    monkeypatch.setenv("FAKE_CLAUDE_NO_STREAM", "1")
+
+    async def scenario():
+        runner = ClaudeRunner(tmp_path)
+        try:
+            return runner, await runner.run("a", "s1")
+        finally:
+            await runner.close()
+
+    runner, reply = asyncio.run(scenario())
+    assert reply == "once: a"
+    assert runner._persistent is False
+    assert not runner._processes
+
+
+def test_process_dying_mid_turn_raises(fake_claude, tmp_path):
+    """A process exiting without a result fails that message only."""
+
+    async def scenario():
+        runner = ClaudeRunner(tmp_path)
+        try:
+            with pytest.raises(ClaudeExecutionError, match="crashed"):
+                await runner.run("die", "s1")
+            return runner, await runner.run("a", "s1")
+        finally:
+            await runner.close()
+
+    runner, reply = asyncio.run(scenario())
+    assert reply.endswith(":1:a")
+    assert runner._persistent is True
@@ -0,0 +1,98 @@
+"""Tests for session_manager."""
+
+import json
+
+import session_manager
+from session_manager import SessionManager
+
+
+def _records(path) -> list[dict]:
+    """Return the parsed records of a sessions log."""
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def _session(message_count: int = 0) -> dict:
+    """Return a serialized session."""
+    return {
+        "session_id": "8a4c0f7e-0000-4000-8000-000000000001",
+        "created_at": "2026-01-01T00:00:00Z",
+        "last_used": "2026-01-01T00:00:00Z",
+        "message_count": message_count,
+    }
+
+
+def test_legacy_file_is_migrated_on_next_save(tmp_path):
+    """The old {"users": {...}} file loads and is rewritten as JSONL."""
+    path = tmp_path / "sessions.json"
+    path.write_text(json.dumps({"users": {"1": _session(3)}}, indent=2))
+
+    manager = SessionManager(path)
+    assert manager.get_session(1).message_count == 3
+
+    manager.create_session(2)
+    assert [record["u"] for record in _records(path)] == [1, 2]
+    assert SessionManager(path).get_session(1).message_count == 3
+
+
+def test_appended_records_last_one_wins(tmp_path):
+    """Each change appends a line; reloading keeps the latest per user."""
+    path = tmp_path / "sessions.json"
+    manager = SessionManager(path)
+    manager.create_session(1)
+    manager.update_session(1)
+    manager.update_session(1)
+
+    assert len(_records(path)) == 3
+    assert SessionManager(path).get_session(1).message_count == 2
+
+
+def test_cleared_session_is_written_as_null(tmp_path):
+    """Clearing appends a tombstone that wins on reload."""
+    path = tmp_path / "sessions.json"
+    manager = SessionManager(path)
+    manager.create_session(1)
+    manager.clear_session(1)
+
+    assert _records(path)[-1] == {"u": 1, "s": None}
+    assert SessionManager(path).get_session(1) is None
+
+
+def test_torn_last_line_is_skipped_and_compacted(tmp_path):
+    """A partially written last line is ignored and rewritten away."""
+    path = tmp_path / "sessions.json"
+    SessionManager(path).create_session(1)
+    with open(path, "a") as f:
+        f.write('{"u": 2, "s": {"sess')
+
+    manager = SessionManager(path)
+    assert list(manager.get_all_sessions()) == [1]
+
+    manager.create_session(3)
+    assert [record["u"] for record in _records(path)] == [1, 3]
+
+
+def test_malformed_entries_are_dropped(tmp_path):
+    """Unparseable lines and invalid sessions don't affect other users."""
+    path = tmp_path / "sessions.json"
+    SessionManager(path).create_session(1)
+    with open(path, "a") as f:
+        f.write("not json\n")
+        f.write(json.dumps({"u": 2, "s": {"bogus": True}}) + "\n")
+
+    manager = SessionManager(path)
+    assert manager.get_session(2) is None
+    assert list(manager.get_all_sessions()) == [1]
+
+
+def test_long_log_is_compacted(tmp_path, monkeypatch):
+    """The log is rewritten with one line per session once it grows."""
+    monkeypatch.setattr(session_manager, "COMPACT_MIN_LINES", 3)
+    path = tmp_path / "sessions.json"
+    manager = SessionManager(path)
+    manager.create_session(1)
+    for _ in range(5):
+        manager.update_session(1)
+
+    # Six changes, but the log never exceeds the threshold
+    assert len(_records(path)) <= 3
+    assert SessionManager(path).get_session(1).message_count == 5
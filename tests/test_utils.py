@@ -0,0 +1,66 @@
+"""Tests for utils."""
+
+import time
+
+from utils import format_for_telegram, split_message
+
+
+def test_nested_spans():
+    """Bold and italic nest inside each other."""
+    assert format_for_telegram("*italic **bold** more*") == (
+        "<i>italic <b>bold</b> more</i>"
+    )
+    assert format_for_telegram("**a *b* c**") == "<b>a <i>b</i> c</b>"
+    assert format_for_telegram("- **Key**: *value*") == (
+        "- <b>Key</b>: <i>value</i>"
+    )
+
+
+def test_pathological_italic_is_linear():
+    """Many bold spans after a lone asterisk must not backtrack exponentially."""
+    lines = [
+        "* Options: " + ", ".join(f"**opt{i}**" for i in range(16)),
+        "*" + "a **b" * 32,
+    ]
+    start = time.perf_counter()
+    for line in lines:
+        format_for_telegram(line)
+    assert time.perf_counter() - start < 1.0
+
+
+def test_split_message_short_text_is_one_chunk():
+    """Text within the limit is returned as is."""
+    assert split_message("hello", max_length=10) == ["hello"]
+
+
+def test_split_message_prefers_paragraph_boundary():
+    """A paragraph break in the second half of the window wins."""
+    text = "a" * 12 + "\n\n" + "b" * 10
+    assert split_message(text, max_length=20) == ["a" * 12, "b" * 10]
+
+
+def test_split_message_falls_back_to_line_boundary():
+    """A paragraph break in the first half is ignored for a later newline."""
+    text = "a" * 4 + "\n\n" + "c" * 7 + "\n" + "b" * 10
+    assert split_message(text, max_length=20) == ["a" * 4 + "\n\n" + "c" * 7, "b" * 10]
+
+
+def test_split_message_falls_back_to_word_boundary():
+    """A newline in the first half is ignored for a later space."""
+    text = "a" * 4 + "\n" + "c" * 8 + " " + "b" * 10
+    assert split_message(text, max_length=20) == ["a" * 4 + "\n" + "c" * 8, "b" * 10]
+
+
+def test_split_message_hard_splits_without_boundaries():
+    """Text with no usable boundary is cut at max_length."""
+    assert split_message("a" * 25, max_length=10) == ["a" * 10, "a" * 10, "a" * 5]
+
+
+def test_split_message_returns_fresh_lists():
+    """Mutating a result must not corrupt the memoized split."""
+    text = "a" * 25
+    first = split_message(text, max_length=10)
+    first.append("mutated")
+    second = split_message(text, max_length=10)
+    assert second == ["a" * 10, "a" * 10, "a" * 5]
+    assert second is not split_message(text, max_length=10)
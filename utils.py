@@ -1,8 +1,12 @@
 """Utility functions for message formatting and splitting."""
 
 import re
+from functools import lru_cache
 from typing import Iterator
 
+# Number of recent responses whose formatting/splitting is memoized
+_CACHE_SIZE = 32
+
 
 def split_message(text: str, max_length: int = 4000) -> list[str]:
     """Split long messages for Telegram's 4096 char limit.
@@ -22,37 +26,51 @@ def split_message(text: str, max_length: int = 4000) -> list[str]:
     if len(text) <= max_length:
         return [text]
 
+    # Results are memoized as tuples; hand out a fresh list each call
+    return list(_split_message_cached(text, max_length))
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _split_message_cached(text: str, max_length: int) -> tuple[str, ...]:
+    """Split text longer than max_length (see split_message)."""
     chunks: list[str] = []
-    remaining = text
+    half = max_length // 2
+    n = len(text)
+    i = 0
 
-    while remaining:
-        if len(remaining) <= max_length:
-            chunks.append(remaining)
-            break
+    # Walk a cursor over text; rfind with bounds avoids slicing each window
+    while n - i > max_length:
+        window_end = i + max_length
 
         # Find best split point
-        split_at = max_length
+        split_at = window_end
 
         # Try paragraph boundary first
-        para_match = remaining[:max_length].rfind("\n\n")
-        if para_match > max_length // 2:
+        para_match = text.rfind("\n\n", i, window_end)
+        if para_match - i > half:
             split_at = para_match + 2
         else:
             # Try line boundary
-            line_match = remaining[:max_length].rfind("\n")
-            if line_match > max_length // 2:
+            line_match = text.rfind("\n", i, window_end)
+            if line_match - i > half:
                 split_at = line_match + 1
             else:
                 # Try word boundary
-                word_match = remaining[:max_length].rfind(" ")
-                if word_match > max_length // 2:
+                word_match = text.rfind(" ", i, window_end)
+                if word_match - i > half:
                     split_at = word_match + 1
 
-        chunk = remaining[:split_at].rstrip()
-        chunks.append(chunk)
-        remaining = remaining[split_at:].lstrip()
+        chunks.append(text[i:split_at].rstrip())
 
-    return chunks
+        # Skip whitespace at the start of the next chunk
+        i = split_at
+        while i < n and text[i].isspace():
+            i += 1
+
+    if i < n:
+        chunks.append(text[i:])
+
+    return tuple(chunks)
 
 
 def format_chunks_with_markers(chunks: list[str]) -> list[str]:
@@ -67,13 +85,17 @@ def format_chunks_with_markers(chunks: list[str]) -> list[str]:
     if len(chunks) <= 1:
         return chunks
 
-    total = len(chunks)
-    return [f"{chunk}\n\n[{i+1}/{total}]" for i, chunk in enumerate(chunks)]
+    # The denominator is the same for every marker, so format it once
+    suffix = f"/{len(chunks)}]"
+    return [f"{chunk}\n\n[{i}{suffix}" for i, chunk in enumerate(chunks, 1)]
 
 
 # Characters that need escaping in MarkdownV2
 MARKDOWN_V2_SPECIAL = r"_*[]()~`>#+-=|{}.!"
 
+# Translation table prefixing each special character with a backslash
+_MDV2_TABLE = str.maketrans({c: "\\" + c for c in MARKDOWN_V2_SPECIAL})
+
 
 def escape_markdown_v2(text: str) -> str:
     """Escape special characters for Telegram MarkdownV2.
@@ -84,48 +106,81 @@ def escape_markdown_v2(text: str) -> str:
     Returns:
         Escaped text safe for MarkdownV2 parsing.
     """
-    for char in MARKDOWN_V2_SPECIAL:
-        text = text.replace(char, f"\\{char}")
-    return text
+    return text.translate(_MDV2_TABLE)
+
+
+# Inline markdown spans converted by format_for_telegram, as named groups
+_INLINE_PATTERN = (
+    r"\*\*(?P<b>.+?)\*\*"
+    r"|`(?P<code>[^`\n]+)`"
+    r"|~~(?P<s>.+?)~~"
+    r"|(?<!\*)\*(?P<i>(?:\*\*[^*\n]+\*\*|[^*\n])+)\*(?!\*)"
+)
+
+# Top level also matches headers: ## Header
+_MARKDOWN_RE = re.compile(
+    r"^#{1,6}\s+(?P<header>.+)$|" + _INLINE_PATTERN, re.MULTILINE
+)
+_INLINE_RE = re.compile(_INLINE_PATTERN)
+
+
+# Translation table for HTML special characters
+_HTML_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
 
 
 def escape_html(text: str) -> str:
     """Escape HTML special characters."""
-    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return text.translate(_HTML_TABLE)
 
 
-def format_for_telegram(text: str) -> str:
-    """Format Claude's markdown output for Telegram HTML mode.
-
-    Supported HTML tags: <b>, <i>, <code>, <pre>, <u>, <s>
+def _markdown_to_html(text: str, pattern: re.Pattern) -> str:
+    """Convert markdown spans to HTML in one scan over text.
 
     Args:
-        text: Markdown text from Claude.
+        text: Raw markdown text.
+        pattern: Token regex (top-level or inline-only).
 
     Returns:
-        Telegram HTML-formatted text.
+        HTML-escaped text with markdown spans replaced by tags.
     """
-    # First escape HTML in the raw text
-    text = escape_html(text)
+    parts: list[str] = []
+    pos = 0
+
+    for match in pattern.finditer(text):
+        parts.append(escape_html(text[pos:match.start()]))
+        kind = match.lastgroup
+        inner = match.group(kind)
+
+        if kind == "code":
+            # Code content is literal
+            parts.append(f"<code>{escape_html(inner)}</code>")
+        else:
+            # Headers render as bold; other spans may contain nested spans
+            tag = "b" if kind == "header" else kind
+            parts.append(f"<{tag}>{_markdown_to_html(inner, _INLINE_RE)}</{tag}>")
+
+        pos = match.end()
 
-    # Convert markdown to HTML
+    parts.append(escape_html(text[pos:]))
+    return "".join(parts)
 
-    # Convert **bold** to <b>bold</b>
-    text = re.sub(r"\*\*(.+?)\*\*", r"<b>\1</b>", text)
 
-    # Convert headers: ## Header -> <b>Header</b>
-    text = re.sub(r"^#{1,6}\s+(.+)$", r"<b>\1</b>", text, flags=re.MULTILINE)
+@lru_cache(maxsize=_CACHE_SIZE)
+def format_for_telegram(text: str) -> str:
+    """Format Claude's markdown output for Telegram HTML mode.
 
-    # Convert `code` to <code>code</code>
-    text = re.sub(r"`([^`\n]+)`", r"<code>\1</code>", text)
+    Supported HTML tags: <b>, <i>, <code>, <pre>, <u>, <s>
 
-    # Convert *italic* to <i>italic</i> (single asterisks, not inside bold)
-    text = re.sub(r"(?<![*<])\*([^*\n]+)\*(?![*>])", r"<i>\1</i>", text)
+    Converts **bold**, ## headers, `code`, *italic* and ~~strikethrough~~
+    in a single pass, escaping HTML in the text between them.
 
-    # Convert ~~strikethrough~~ to <s>strikethrough</s>
-    text = re.sub(r"~~(.+?)~~", r"<s>\1</s>", text)
+    Args:
+        text: Markdown text from Claude.
 
-    return text
+    Returns:
+        Telegram HTML-formatted text.
+    """
+    return _markdown_to_html(text, _MARKDOWN_RE)
 
 
 def convert_markdown_to_telegram(text: str) -> str:
@@ -142,13 +197,46 @@ def is_safe_for_markdown(text: str) -> bool:
     Returns:
         True if text appears safe for markdown parsing.
     """
-    # Simple heuristic: check for unbalanced special chars
-    for char in "*_`":
-        if text.count(char) % 2 != 0:
-            return False
+    # Simple heuristic: check for unbalanced special chars, one C-level
+    # count per char, stopping at the first odd one
+    if text.count("*") & 1:
+        return False
+    if text.count("_") & 1:
+        return False
+    if text.count("`") & 1:
+        return False
     return True
 
 
+# Tags emitted by format_for_telegram (all supported by Telegram HTML mode)
+_ALLOWED_HTML_TAGS = frozenset({"b", "i", "u", "s", "code", "pre"})
+
+# Match a simple <tag> or </tag>, or a stray "<" that isn't one
+_HTML_TAG_RE = re.compile(r"<(/?)([a-z]+)>|<")
+
+
+def is_safe_html(text: str) -> bool:
+    """Check if text has only allowed, properly nested HTML tags.
+
+    Args:
+        text: Telegram HTML-formatted text.
+
+    Returns:
+        True if Telegram should accept the text in HTML mode.
+    """
+    stack: list[str] = []
+    for match in _HTML_TAG_RE.finditer(text):
+        tag = match.group(2)
+        if tag not in _ALLOWED_HTML_TAGS:
+            return False
+        if match.group(1):
+            if not stack or stack.pop() != tag:
+                return False
+        else:
+            stack.append(tag)
+    return not stack
+
+
 def truncate_for_log(text: str, max_length: int = 100) -> str:
     """Truncate text for logging purposes.
 